@@ -21,24 +21,42 @@ Usage:
 """
 import sys
 import itertools
-from copy import deepcopy
-from typing import Union, Tuple, List
+from functools import lru_cache
+from typing import Iterator, Union, Tuple, List
 
-# mapping for shift-row symbols, index by digit char
-_SHIFT_MAP = {
-    '1': '!', '2': '@', '3': '#', '4': '$', '5': '%',
-    '6': '^', '7': '&', '8': '*', '9': '(', '0': ')'
-}
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# shift-row symbols, indexed by digit value (ord(d) - 48) — a plain tuple
+# index is cheaper than dict hashing in the expansion hot loop
+_SHIFT_TUPLE = (')', '!', '@', '#', '$', '%', '^', '&', '*', '(')
+
+# the same symbols widened to a 256-entry table indexed by raw byte value,
+# so hot loops can do _ASCII_SHIFT[ord(c)] with no offset arithmetic
+_ASCII_SHIFT = tuple(
+    _SHIFT_TUPLE[i - 48] if 48 <= i <= 57 else '' for i in range(256)
+)
+
+# masks producing at least this many separators take the vectorized path
+_NUMPY_MIN_OUTPUTS = 1000
+# rows formatted per batch — bounds memory so enumeration stays streaming
+_NUMPY_CHUNK = 4096
 
 # Abstract Syntax Tree (AST) element types
 element_base = Tuple[str]
-element_group = Tuple[str, List["Element"], bool]
+element_group = Tuple[str, Tuple["Element", ...], bool]
 element_lit = Tuple[str, str]
 Element = Union[element_base, element_group, element_lit]
 
-def parse_mask(mask: str) -> List[Element]:
+@lru_cache(maxsize=1024)
+def parse_mask(mask: str) -> Tuple[Element, ...]:
     """
     Parse mask string into AST elements.
+
+    Results are memoized per mask string — pipelines and tests hand the
+    same masks over repeatedly — so the AST is an immutable tuple.
     """
     elements = []
     i = 0
@@ -74,97 +92,227 @@ def parse_mask(mask: str) -> List[Element]:
             # literal char
             elements.append(('lit', mask[i]))
             i += 1
-    return elements
-
-class State:
-    """Holds digit queue and next reference index."""
-    __slots__ = ('digits', 'next_ref')
-    def __init__(self):
-        self.digits = []     # list of digit chars
-        self.next_ref = 0    # index of next to caret-reference
-    def clone(self):
-        st = State()
-        st.digits = self.digits.copy()
-        st.next_ref = self.next_ref
-        return st
-
-
-def expand_elements(elems: List[Element], state: State) -> List[Tuple[str, State]]:
+    return tuple(elements)
+
+
+# each digit paired with its one-byte bytes form, precomputed so the 'd'
+# branch extends the digit queue without constructing bytes per branch
+_DIGIT_PAIRS = tuple((chr(b), bytes([b])) for b in b'0123456789')
+
+def expand_elements(elems: Tuple[Element, ...], digits: bytes = b'',
+                    next_ref: int = 0) -> Iterator[Tuple[str, bytes, int]]:
     """
-    Recursively expand AST elements, returning list of (output, new_state).
+    Recursively expand AST elements, lazily yielding (output, digits,
+    next_ref) one branch at a time.
+
+    State is threaded as an immutable (digits bytes, next_ref) pair:
+    bytes concatenation replaces both the old per-branch list clone and
+    the per-digit one-char str objects, and indexing a bytes object
+    yields the raw ordinal the shift table wants.
+    """
+    if not elems:
+        yield '', digits, next_ref
+        return
+    el = elems[0]
+    rest = elems[1:]
+    typ = el[0]
+    if typ == 'd':
+        for d, db in _DIGIT_PAIRS:
+            for out, dg, nr in expand_elements(rest, digits + db, next_ref):
+                yield d + out, dg, nr
+    elif typ == 'caret':
+        if next_ref >= len(digits):
+            # not enough digits to reference
+            return
+        sym = _ASCII_SHIFT[digits[next_ref]]
+        for out, dg, nr in expand_elements(rest, digits, next_ref + 1):
+            yield sym + out, dg, nr
+    elif typ == 'group':
+        _, sub_elems, rev = el
+        for grp_out, dg, nr in expand_elements(sub_elems, digits, next_ref):
+            if rev:
+                grp_out = grp_out[::-1]
+            for out, dg2, nr2 in expand_elements(rest, dg, nr):
+                yield grp_out + out, dg2, nr2
+    elif typ == 'lit':
+        lit = el[1]
+        for out, dg, nr in expand_elements(rest, digits, next_ref):
+            yield lit + out, dg, nr
+    else:
+        raise ValueError(f"Unknown element type: {typ}")
+
+
+class _CaretUnderflow(Exception):
+    """Raised while flattening when a ?^ has no un-referenced ?d left."""
+
+
+def _flatten_template(elems: Tuple[Element, ...], n_digits: int = 0,
+                      next_ref: int = 0) -> Tuple[List[Tuple[str, Union[int, str]]], int, int]:
+    """
+    Flatten AST elements into a template of one entry per output char:
+    ('d', i) emits digit slot i, ('caret', i) emits the shift symbol of
+    slot i, ('lit', c) emits c. Returns (template, n_digits, next_ref).
+
+    Every leaf emits exactly one char, so a reversed group is just the
+    group's flattened segment in reverse order; digit/caret numbering
+    keeps the pre-reversal traversal order, matching expand_elements.
     """
-    results = [('', state)]
+    template: List[Tuple[str, Union[int, str]]] = []
     for el in elems:
-        new_results = []
         typ = el[0]
         if typ == 'd':
-            # branch on digits
-            for out, st in results:
-                for d in map(str, range(10)):
-                    st2 = st.clone()
-                    st2.digits.append(d)
-                    new_results.append((out + d, st2))
+            template.append(('d', n_digits))
+            n_digits += 1
         elif typ == 'caret':
-            for out, st in results:
-                if st.next_ref >= len(st.digits):
-                    # not enough digits to reference
-                    continue
-                d = st.digits[st.next_ref]
-                sym = _SHIFT_MAP[d]
-                st2 = st.clone()
-                st2.next_ref += 1
-                new_results.append((out + sym, st2))
+            if next_ref >= n_digits:
+                raise _CaretUnderflow
+            template.append(('caret', next_ref))
+            next_ref += 1
         elif typ == 'group':
             _, sub_elems, rev = el
-            for out, st in results:
-                # expand group content from this state
-                grp_exp = expand_elements(sub_elems, st)
-                for grp_out, st2 in grp_exp:
-                    if rev:
-                        grp_out = grp_out[::-1]
-                    new_results.append((out + grp_out, st2))
+            sub_tpl, n_digits, next_ref = _flatten_template(sub_elems, n_digits, next_ref)
+            if rev:
+                sub_tpl.reverse()
+            template.extend(sub_tpl)
         elif typ == 'lit':
-            lit = el[1]
-            for out, st in results:
-                new_results.append((out + lit, st))
+            template.append(('lit', el[1]))
         else:
             raise ValueError(f"Unknown element type: {typ}")
-        results = new_results
-    return results
+    return template, n_digits, next_ref
 
 
-def generate_separators(mask: str) -> List[str]:
+def generate_separators(mask: str) -> Iterator[str]:
     """
-    Given a mask DSL string, return all concrete separators.
+    Given a mask DSL string, lazily yield all concrete separators.
+
+    The DSL has no data-dependent branching — each ?d always draws
+    0-9 and each ?^ deterministically references one earlier slot — so
+    the whole output is a base-10 enumeration over the digit slots.
+    We flatten the AST to a per-char template once, then count through
+    10^k in a tight loop instead of recursing per branch.
     """
     ast = parse_mask(mask)
-    init = State()
-    exps = expand_elements(ast, init)
-    # return only output strings
-    return [out for out, _ in exps]
+    try:
+        template, k, _ = _flatten_template(ast)
+    except _CaretUnderflow:
+        # a ?^ with no digit to reference produces no outputs
+        return
+    if k == 0:
+        yield ''.join(val for _, val in template)
+        return
+    # the vectorized path formats into a uint8 matrix and decodes as
+    # ASCII, so it can only take masks whose literals are ASCII; digits
+    # and shift symbols always are
+    if (np is not None and 10 ** k >= _NUMPY_MIN_OUTPUTS
+            and all(ord(val) < 128 for kind, val in template if kind == 'lit')):
+        yield from _enumerate_numpy(template, k)
+        return
+    # specialize the loop body: literals are written into the parts list
+    # once, and the dynamic slots are precomputed (template position,
+    # digit index) pairs, so each iteration is just slot assignments and
+    # one join — no per-char kind dispatch
+    parts = [val if kind == 'lit' else '' for kind, val in template]
+    d_slots = [(ti, val) for ti, (kind, val) in enumerate(template) if kind == 'd']
+    c_slots = [(ti, val) for ti, (kind, val) in enumerate(template) if kind == 'caret']
+    shift = _ASCII_SHIFT
+    join = ''.join
+    for i in range(10 ** k):
+        digits = f"{i:0{k}d}"
+        for ti, di in d_slots:
+            parts[ti] = digits[di]
+        for ti, di in c_slots:
+            parts[ti] = shift[ord(digits[di])]
+        yield join(parts)
+
+
+def _enumerate_numpy(template, k):
+    """
+    Vectorized enumeration for masks with large digit products.
+
+    Formats separators in batches: extract every digit of a chunk of
+    counter values with one broadcast divmod into a uint8 matrix, fill
+    the template columns (digit, shift symbol, or constant literal) with
+    array ops, then decode the whole chunk to ASCII once and slice it
+    into fixed-width separators. Chunking keeps peak memory bounded so
+    the generator still streams.
+    """
+    width = len(template)
+    pows = 10 ** np.arange(k - 1, -1, -1, dtype=np.int64)
+    shift_codes = np.frombuffer(''.join(_SHIFT_TUPLE).encode('ascii'), dtype=np.uint8)
+    total = 10 ** k
+    for lo in range(0, total, _NUMPY_CHUNK):
+        vals = np.arange(lo, min(lo + _NUMPY_CHUNK, total), dtype=np.int64)
+        digit_mat = ((vals[:, None] // pows) % 10).astype(np.uint8)
+        out = np.empty((len(vals), width), dtype=np.uint8)
+        for ti, (kind, val) in enumerate(template):
+            if kind == 'd':
+                out[:, ti] = digit_mat[:, val] + 48
+            elif kind == 'caret':
+                out[:, ti] = shift_codes[digit_mat[:, val]]
+            else:
+                out[:, ti] = ord(val)
+        text = out.tobytes().decode('ascii')
+        for r in range(len(vals)):
+            yield text[r * width:(r + 1) * width]
+
+
+# masks whose digit product is at most this are materialized once and
+# reused across lines; larger masks stay streaming to bound memory
+_CACHE_MAX_SEPS = 10 ** 4
+
+def _mask_product(mask: str) -> int:
+    """Number of separators the mask will produce (0 on caret underflow)."""
+    try:
+        _, k, _ = _flatten_template(parse_mask(mask))
+    except _CaretUnderflow:
+        return 0
+    return 10 ** k
+
+
+@lru_cache(maxsize=64)
+def _pooled_separators(mask: str) -> Tuple[str, ...]:
+    """
+    Materialized separators for a small mask, memoized across pipeline
+    invocations so repeated runs over the same mask reuse the pool.
+    """
+    return tuple(generate_separators(mask))
 
 
 def fill_interstices(lines, masks):
     """
     Yield word1+sep+word2 for each line and each mask.
     """
-    # cache generated separators per mask
-    cache: dict[str, List[str]] = {}
-    for mask in masks:
-        cache[mask] = generate_separators(mask)
-
+    # small masks get their separators generated once and interned in a
+    # shared pool; re-expanding them per line would redo the same strings
+    # for every input pair
+    pooled = {mask for mask in masks if _mask_product(mask) <= _CACHE_MAX_SEPS}
     for raw in lines:
         parts = raw.strip().split()
         if len(parts) != 2:
             continue
         w1, w2 = parts
         for mask in masks:
-            for sep in cache[mask]:
-                yield f"{w1}{sep}{w2}"
+            if mask in pooled:
+                seps = _pooled_separators(mask)
+            else:
+                # too large to pool — stream the expansion per line
+                seps = generate_separators(mask)
+            for sep in seps:
+                yield w1 + sep + w2
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         sys.exit("Usage: fill_interstices.py <mask1> [<mask2> ...]")
     masks = sys.argv[1:]
+    # batch combos and write them in one go; per-combo print() dominates
+    # runtime at 10^n outputs per line
+    buf = []
     for combo in fill_interstices(sys.stdin, masks):
-        print(combo)
+        buf.append(combo)
+        if len(buf) >= 8192:
+            sys.stdout.write('\n'.join(buf))
+            sys.stdout.write('\n')
+            buf.clear()
+    if buf:
+        sys.stdout.write('\n'.join(buf))
+        sys.stdout.write('\n')
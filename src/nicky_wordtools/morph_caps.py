@@ -21,10 +21,16 @@ Usage:
     cat lines.txt | python3 morph_caps.py w1^2{1-2} w2$1{1-1}
 """
 import sys
-import re
-from typing import List, Tuple
+from functools import lru_cache
+from typing import Callable, List, Tuple
 
-SPEC_RE = re.compile(r'^w(?P<start>\d+)(?:-(?P<end>\d+))?(?P<dir>[\^$])(?P<pos>\d+)\{(?P<min>\d+)-(?P<max>\d+)\}$')
+# How many output lines to batch before each stdout write
+_FLUSH_EVERY = 8192
+
+# byte-level uppercase table: avoids the Unicode-aware str.upper() for the
+# ASCII words that dominate wordlists
+_UPPER_TRANS = bytes.maketrans(b'abcdefghijklmnopqrstuvwxyz',
+                               b'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
 
 class Spec:
     def __init__(self, start: int, end: int, direction: str,
@@ -35,72 +41,194 @@ class Spec:
         self.pos = pos
         self.min_span = min_span
         self.max_span = max_span
+        self._compiled = None
+
+    def compile(self) -> Callable[[str], List[str]]:
+        """
+        Specialize this spec into a closure over its fields.
+
+        The returned function is called once per line on the hot path, so
+        everything spec-dependent — index range, direction, span lengths,
+        span base — is hoisted out of the loop into closure locals,
+        replacing repeated attribute lookups with local variable reads.
+        """
+        first_wi = self.start - 1
+        last_wi = self.end
+        pos = self.pos
+        base = pos - 1
+        mirror = self.direction == '$'
+        span_lengths = range(self.min_span, self.max_span + 1)
+        max_span = self.max_span
+        spec_start, spec_end = self.start, self.end
+        # exact variant count per word: sum of (max_span - span_len + 1)
+        # over the span lengths; clipping at word edges can only shrink it
+        per_word = sum(max_span - s + 1 for s in span_lengths)
+        max_variants = (last_wi - first_wi) * per_word
+
+        def apply(line: str) -> List[str]:
+            words = line.split()
+            # preallocate to the upper bound and truncate at the end,
+            # avoiding amortized-doubling regrowth per append
+            results = [None] * max_variants
+            k = 0
+            # validate word indices
+            if first_wi < 0 or last_wi > len(words):
+                raise ValueError(f"Word index range {spec_start}-{spec_end} out of bounds for line '{line}'")
+            # apply spec for each word index
+            for wi in range(first_wi, last_wi):
+                word = words[wi]
+                wlen = len(word)
+                # validate pos
+                if pos < 1 or pos > wlen:
+                    raise ValueError(f"Position {pos} out of bounds for word '{word}' in line '{line}'")
+                # the unchanged words around wi are the same for every variant,
+                # so join them once instead of copying+rejoining the whole list
+                left = ' '.join(words[:wi])
+                right = ' '.join(words[wi + 1:])
+                lsep = left + ' ' if left else ''
+                rsep = ' ' + right if right else ''
+                # ASCII words take the byte-table path; anything else falls
+                # back to str slicing + upper()
+                try:
+                    word_b = word.encode('ascii')
+                    # one working buffer per word, mutated in place per
+                    # span and restored after, instead of a fresh
+                    # bytearray copy per variant
+                    buf = bytearray(word_b)
+                except UnicodeEncodeError:
+                    word_b = None
+                # generate spans
+                for span_len in span_lengths:
+                    max_offset = max_span - span_len
+                    for offset in range(max_offset + 1):
+                        start = base + offset
+                        end = start + span_len
+                        if start < 0 or end > wlen:
+                            continue
+                        if mirror:
+                            # '$' specs index from the back: mirror the span
+                            # instead of reversing the word twice
+                            start, end = wlen - end, wlen - start
+                        if word_b is not None:
+                            span = word_b[start:end]
+                            buf[start:end] = span.translate(_UPPER_TRANS)
+                            final_word = buf.decode('ascii')
+                            buf[start:end] = span
+                        else:
+                            final_word = word[:start] + word[start:end].upper() + word[end:]
+                        results[k] = f"{lsep}{final_word}{rsep}"
+                        k += 1
+            del results[k:]
+            return results
+
+        return apply
 
     def apply_to_line(self, line: str) -> List[str]:
-        words = line.split()
-        results = []
-        # validate word indices
-        n_words = len(words)
-        if self.start < 1 or self.end > n_words:
-            raise ValueError(f"Word index range {self.start}-{self.end} out of bounds for line '{line}'")
-        # apply spec for each word index
-        for wi in range(self.start - 1, self.end):
-            word = words[wi]
-            # validate pos
-            if self.pos < 1 or self.pos > len(word):
-                raise ValueError(f"Position {self.pos} out of bounds for word '{word}' in line '{line}'")
-            # choose working representation
-            if self.direction == '^':
-                rep = word
-                rev_flag = False
-            else:
-                rep = word[::-1]
-                rev_flag = True
-            # generate spans
-            for span_len in range(self.min_span, self.max_span + 1):
-                max_offset = self.max_span - span_len
-                base = self.pos - 1
-                for offset in range(max_offset + 1):
-                    start = base + offset
-                    end = start + span_len
-                    if start < 0 or end > len(rep):
-                        continue
-                    mutated = rep[:start] + rep[start:end].upper() + rep[end:]
-                    final_word = mutated[::-1] if rev_flag else mutated
-                    new_words = words.copy()
-                    new_words[wi] = final_word
-                    results.append(' '.join(new_words))
-        return results
+        fn = self._compiled
+        if fn is None:
+            fn = self._compiled = self.compile()
+        return fn(line)
 
 
+def _scan_digits(s: str, i: int) -> int:
+    """Return the index just past the digit run starting at i."""
+    n = len(s)
+    while i < n and '0' <= s[i] <= '9':
+        i += 1
+    return i
+
+
+@lru_cache(maxsize=1024)
 def parse_spec(s: str) -> Spec:
-    m = SPEC_RE.match(s)
-    if not m:
+    # memoized: the same spec strings recur across pipeline invocations,
+    # and a cached Spec also keeps its compiled closure warm.
+    # The grammar — w<start>[-<end>]<dir><pos>{<min>-<max>} — is simple
+    # enough that a linear scan beats a regex with six capture groups.
+    def fail():
         raise ValueError(f"Invalid spec '{s}'")
-    start = int(m.group('start'))
-    end = int(m.group('end')) if m.group('end') else start
-    direction = m.group('dir')
-    pos = int(m.group('pos'))
-    min_span = int(m.group('min'))
-    max_span = int(m.group('max'))
+
+    n = len(s)
+    if n == 0 or s[0] != 'w':
+        fail()
+    i = 1
+    j = _scan_digits(s, i)
+    if j == i:
+        fail()
+    start = int(s[i:j])
+    i = j
+    end = start
+    if i < n and s[i] == '-':
+        j = _scan_digits(s, i + 1)
+        if j == i + 1:
+            fail()
+        end = int(s[i + 1:j])
+        i = j
+    if i >= n or s[i] not in '^$':
+        fail()
+    direction = s[i]
+    i += 1
+    j = _scan_digits(s, i)
+    if j == i:
+        fail()
+    pos = int(s[i:j])
+    i = j
+    if i >= n or s[i] != '{':
+        fail()
+    i += 1
+    j = _scan_digits(s, i)
+    if j == i:
+        fail()
+    min_span = int(s[i:j])
+    i = j
+    if i >= n or s[i] != '-':
+        fail()
+    i += 1
+    j = _scan_digits(s, i)
+    if j == i:
+        fail()
+    max_span = int(s[i:j])
+    i = j
+    if i != n - 1 or s[i] != '}':
+        fail()
     if min_span < 1 or max_span < min_span:
         raise ValueError(f"Invalid span range {min_span}-{max_span} in spec '{s}'")
     return Spec(start, end, direction, pos, min_span, max_span)
 
 
-def main():
-    if len(sys.argv) < 2:
-        sys.exit("Usage: morph_caps.py <spec1> [<spec2> ...]")
-    specs = [parse_spec(arg) for arg in sys.argv[1:]]
-    for line in sys.stdin:
+def morph_iter(lines, specs):
+    """
+    Yield all capitalization variants of `lines` for each spec in `specs`.
+
+    Specs are compiled once up front; lines that a spec cannot apply to
+    report the error on stderr and are skipped, matching CLI behavior.
+    """
+    compiled = [spec.compile() for spec in specs]
+    for line in lines:
         line = line.rstrip('\n')
-        for spec in specs:
+        for fn in compiled:
             try:
-                for out in spec.apply_to_line(line):
-                    print(out)
+                yield from fn(line)
             except ValueError as e:
                 print(f"Error: {e}", file=sys.stderr)
                 continue
 
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("Usage: morph_caps.py <spec1> [<spec2> ...]")
+    specs = [parse_spec(arg) for arg in sys.argv[1:]]
+    # batch variants and write them in one go every _FLUSH_EVERY lines;
+    # per-variant print() dominates runtime on high-volume output
+    buf = []
+    for out in morph_iter(sys.stdin, specs):
+        buf.append(out)
+        if len(buf) >= _FLUSH_EVERY:
+            sys.stdout.write('\n'.join(buf))
+            sys.stdout.write('\n')
+            buf.clear()
+    if buf:
+        sys.stdout.write('\n'.join(buf))
+        sys.stdout.write('\n')
+
 if __name__ == '__main__':
     main()
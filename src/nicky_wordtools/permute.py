@@ -9,75 +9,321 @@ Each line of input should be:
     <word> <weight>
 
 The script reads all entries, generates every ordered pair of distinct words,
-calculates the total weight (weight1 + weight2), sorts by total weight
-(descending) then by first-word weight (descending), and prints each pair
-as "word1 word2" to stdout. If any weight is missing or invalid, the line
-is treated as unweighted and pairs are output in input order.
+calculates the total weight (weight1 + weight2), and prints pairs as
+"word1 word2" to stdout in descending order of (total weight, first-word
+weight), with each pair immediately followed by its mirror. If any weight
+is missing or invalid, the line is treated as unweighted and pairs are
+output in input order.
 """
+import heapq
+import re
 import sys
 
-def permute_by_value(lines):
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Below this many entries the NumPy array setup costs more than it saves
+_NUMPY_MIN_ENTRIES = 64
+
+# How many output lines to batch before each stdout write
+_FLUSH_EVERY = 8192
+
+# pairs formatted per vectorized batch — bounds the transient string
+# arrays so the numpy path stays streaming
+_NUMPY_CHUNK = 4096
+
+# trimmed, non-blank line contents: one findall over the whole input
+# buffer replaces a per-line strip + emptiness check in Python
+_CONTENT_RE = re.compile(r'^[^\S\n]*(\S.*?)[^\S\n]*$', re.MULTILINE)
+
+def _write_buffered(out_lines, out=None):
+    """
+    Write an iterable of lines to `out` (default stdout) in large
+    '\\n'-joined batches.
+
+    One write call per _FLUSH_EVERY lines is a constant-factor win over
+    per-line print() for the N^2-sized outputs this script produces.
+    Each batch is encoded once and written to the raw byte stream when
+    the sink exposes one, skipping the text wrapper's incremental
+    encode/bookkeeping; sinks without a buffer (StringIO and friends)
+    take the plain text write.
+    """
+    if out is None:
+        out = sys.stdout
+    raw = getattr(out, 'buffer', None)
+    encoding = out.encoding or 'utf-8' if raw is not None else None
+
+    def flush(batch):
+        text = '\n'.join(batch) + '\n'
+        if raw is not None:
+            raw.write(text.encode(encoding))
+        else:
+            out.write(text)
+
+    buf = []
+    for s in out_lines:
+        buf.append(s)
+        if len(buf) >= _FLUSH_EVERY:
+            flush(buf)
+            buf.clear()
+    if buf:
+        flush(buf)
+
+def permute_iter(lines):
     """
-    Generate and print ordered word pairs based on optional weights.
+    Yield ordered word pairs based on optional weights.
 
     Reads lines of 'word' + optional 'weight' from the iterable `lines`, computes every
     ordered pair (word1, word2) where word1 != word2.
 
-    If all weights parse as numbers, sorts pairs descending by (weight1 + weight2)
-    then by weight1. If any weight is missing or invalid, treats input as unweighted
-    and outputs pairs in the same order words appeared in the file.
+    If all weights parse as numbers, yields pairs descending by (weight1 + weight2)
+    then by weight1, each pair followed by its mirror. If any weight is missing
+    or invalid, treats input as unweighted and yields pairs in the same order
+    words appeared in the file.
 
     Args:
-        lines: Iterable of strings, each containing a word and optionally a weight.
+        lines: Input text as a whole str, a file-like object, or an
+            iterable of lines, each containing a word and optionally a weight.
+
+    Yields:
+        "word1 word2" strings, one per ordered pair.
     """
-    entries = []
+    # parallel word/weight arrays (SoA): the numeric hot paths touch only
+    # the weights, so keeping them in their own flat list avoids tuple
+    # allocation and unpacking per entry
+    words = []
+    weights = []
     unweighted_mode = False
 
+    # str input is taken as a whole buffer, and file-like inputs are
+    # slurped in one read(): every entry gets materialized below anyway,
+    # and one regex pass over the buffer yields the trimmed non-blank
+    # lines at C speed, replacing the per-line iterator protocol plus
+    # strip/blank checks. Plain iterables (e.g. upstream pipeline
+    # generators) are consumed as-is.
+    if hasattr(lines, 'read'):
+        lines = lines.read()
+    pre_trimmed = isinstance(lines, str)
+    if pre_trimmed:
+        lines = _CONTENT_RE.findall(lines)
+
     # Read all entries, track if any weight is missing or invalid
     for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+        # buffer-tokenized lines are already trimmed and non-blank
+        if not pre_trimmed:
+            line = line.strip()
+            if not line:
+                continue
 
         parts = line.split()
         if len(parts) < 2:
             # No weight → unweighted mode
-            entries.append((parts[0], None))
+            words.append(parts[0])
+            weights.append(None)
             unweighted_mode = True
         else:
             word = " ".join(parts[:-1])
-            w_str = parts[-1]
-            try:
-                wt = float(w_str)
-                entries.append((word, wt))
-            except ValueError:
-                # Invalid weight → unweighted mode
-                entries.append((word, None))
-                unweighted_mode = True
-
-    if not entries:
+            if unweighted_mode:
+                # the fallback is already decided, so the weight token is
+                # dead — don't bother parsing it
+                wt = None
+            else:
+                try:
+                    wt = float(parts[-1])
+                except ValueError:
+                    # Invalid weight → unweighted mode
+                    wt = None
+                    unweighted_mode = True
+            words.append(word)
+            weights.append(wt)
+
+    yield from _iter_pairs(words, weights, unweighted_mode)
+
+
+def _iter_pairs(words, weights, unweighted_mode=False):
+    """
+    Emission kernel: yield ordered pairs from pre-tokenized parallel
+    word/weight arrays.
+
+    Split out from permute_iter so the pair-generation hot path can be
+    exercised and profiled on canned records without the line parsing
+    in front of it.
+    """
+    if not words:
         return
 
-    # Unweighted mode: preserve the input order of words
     if unweighted_mode:
-        words = [word for word, _ in entries]
-        for w1 in words:
-            for w2 in words:
-                if w1 != w2:
-                    print(f"{w1} {w2}")
+        yield from _iter_unweighted(words)
         return
 
-    # Weighted mode: build and sort by (total weight, first-word weight)
-    pairs = []
-    for word1, wt1 in entries:
-        for word2, wt2 in entries:
-            if word1 == word2:
-                continue
-            pairs.append((wt1 + wt2, wt1, word1, word2))
+    # Weighted mode: stream pairs in (total weight, first-word weight)
+    # descending order without materializing or sorting the full N^2 list.
+    # Entries sorted by weight descending make (i, j) with i < j a sorted
+    # Cartesian frontier: the best unseen pair is always on a heap of
+    # candidates seeded with (0, 1), where popping (i, j) exposes
+    # (i, j+1) and, from the first row, (i+1, i+2). Each popped pair is
+    # emitted together with its mirror (same total, lower first weight).
+    if len(words) < 2:
+        return
+    if np is not None and len(words) >= _NUMPY_MIN_ENTRIES:
+        # stable C-level key sort on the raw float array instead of a
+        # Python comparator over an index permutation
+        order = np.argsort(-np.asarray(weights, dtype=np.float64), kind='stable')
+    else:
+        order = sorted(range(len(words)), key=weights.__getitem__, reverse=True)
+    words = [words[i] for i in order]
+    weights = [weights[i] for i in order]
+    # wordlists often repeat a handful of weights; with k distinct values
+    # the pair order is decided by sorting k^2 group pairs instead of
+    # ranking n^2 records. Only worth it while k^2 stays within O(n) so
+    # memory matches the streaming paths.
+    k_distinct = len(set(weights))
+    if k_distinct * k_distinct <= len(words):
+        yield from _iter_weighted_grouped(words, weights)
+    elif np is not None and len(words) >= _NUMPY_MIN_ENTRIES:
+        yield from _iter_weighted_numpy(words, weights)
+    else:
+        yield from _iter_weighted_heap(words, weights)
+
+
+def permute_by_value(lines, out=None):
+    """
+    CLI entry: run permute_iter over `lines` and write the pairs to
+    `out` (default stdout).
+    """
+    _write_buffered(permute_iter(lines), out)
+
+
+def _iter_unweighted(words):
+    """
+    Emit pairs in input order for the unweighted fallback.
+
+    A dedicated tight double loop: no key materialization, no sort, no
+    weight lookups. The equality check suppresses the diagonal and, for
+    duplicate entries, same-word pairs — "every ordered pair of
+    distinct words", as the module contract says.
+    """
+    for w1 in words:
+        prefix = w1 + " "
+        for w2 in words:
+            if w2 != w1:
+                yield prefix + w2
+
 
-    pairs.sort(key=lambda x: (x[0], x[1]), reverse=True)
-    for _, _, w1, w2 in pairs:
-        print(f"{w1} {w2}")
+def _iter_weighted_heap(words, weights):
+    """Stream pairs from weight-sorted word/weight arrays via the frontier heap."""
+    n = len(words)
+    # bind the heap primitives as locals: one pop and up to two pushes run
+    # per emitted pair, so repeated module-attribute lookups add up
+    heappop = heapq.heappop
+    heappush = heapq.heappush
+    prefixes = [w + " " for w in words]
+    heap = [(-(weights[0] + weights[1]), -weights[0], 0, 1)]
+    while heap:
+        _, _, i, j = heappop(heap)
+        # i < j always holds, so the diagonal never appears; the word
+        # compare only suppresses duplicate entries pairing with
+        # themselves
+        wt1 = weights[i]
+        if words[i] != words[j]:
+            yield prefixes[i] + words[j]
+            yield prefixes[j] + words[i]
+        if j + 1 < n:
+            heappush(heap, (-(wt1 + weights[j + 1]), -wt1, i, j + 1))
+        if j == i + 1 and j + 1 < n:
+            wt_next = weights[j]
+            heappush(heap, (-(wt_next + weights[j + 1]), -wt_next, j, j + 1))
+
+
+def _iter_weighted_grouped(words, weights):
+    """
+    Stream pairs from weight-sorted arrays by bucketing equal weights.
+
+    After the descending stable sort, equal weights form contiguous runs
+    and every pair inside a (run_a, run_b) combination shares the same
+    (total, wt1) key, so ranking the k^2 run pairs fully determines the
+    output order; within a run pair, index order matches the frontier
+    heap's (i, j) tie-break. For the common all-equal-weight case this
+    degenerates to a single unsorted double loop.
+    """
+    n = len(words)
+    runs = []
+    start = 0
+    for i in range(1, n + 1):
+        if i == n or weights[i] != weights[start]:
+            runs.append((start, i))
+            start = i
+    run_pairs = []
+    for a in range(len(runs)):
+        wa = weights[runs[a][0]]
+        for b in range(a, len(runs)):
+            wb = weights[runs[b][0]]
+            run_pairs.append((-(wa + wb), -wa, a, b))
+    run_pairs.sort()
+    # formatting each word with its trailing space once beats re-building
+    # the "word1 " half of the pair n-1 times in the inner loops
+    prefixes = [w + " " for w in words]
+    for _, _, a, b in run_pairs:
+        sa, ea = runs[a]
+        sb, eb = runs[b]
+        for i in range(sa, ea):
+            w1 = words[i]
+            prefix = prefixes[i]
+            for j in range(max(i + 1, sb), eb):
+                if words[j] != w1:
+                    yield prefix + words[j]
+                    yield prefixes[j] + w1
+
+
+def _iter_weighted_numpy(words, weights):
+    """
+    Vectorized equivalent of _iter_weighted_heap for large inputs.
+
+    Builds the upper-triangle (i, j) index pair arrays, computes all pair
+    totals with one broadcast add, and ranks them with np.lexsort on the
+    same (-total, -wt1, i, j) key the heap uses, so the output order is
+    identical. The O(N^2) numeric work runs in C instead of Python
+    bytecode; only the final formatting loop stays in Python.
+    """
+    wts = np.asarray(weights, dtype=np.float64)
+    # integer sort keys beat float keys (no sign-magnitude bit handling),
+    # and typical weights are small integers or short decimals that are
+    # exact in 20-bit fixed point. Only switch when the quantization
+    # round-trips exactly, so ordering and tie classes never change;
+    # anything else (huge magnitudes, long fractions) keeps float keys.
+    scaled = wts * (1 << 20)
+    quantized = np.rint(scaled)
+    if np.all(quantized == scaled) and np.all(np.abs(quantized) < 2 ** 62):
+        wts = quantized.astype(np.int64)
+    i_idx, j_idx = np.triu_indices(len(words), k=1)
+    wi = wts[i_idx]
+    # triu_indices with k=1 already excludes the diagonal
+    order = np.lexsort((j_idx, i_idx, -wi, -(wi + wts[j_idx])))
+    i_idx = i_idx[order]
+    j_idx = j_idx[order]
+    # format the lines themselves with np.char broadcasts instead of a
+    # per-pair Python concatenation loop; chunking bounds the transient
+    # fixed-width string arrays. Forward and mirror lines are built as
+    # two whole arrays and interleaved, preserving mirror adjacency.
+    words_arr = np.asarray(words)
+    left_sp = np.char.add(words_arr, ' ')
+    for lo in range(0, len(i_idx), _NUMPY_CHUNK):
+        ic = i_idx[lo:lo + _NUMPY_CHUNK]
+        jc = j_idx[lo:lo + _NUMPY_CHUNK]
+        # duplicate entries pairing with themselves are suppressed, as in
+        # the pure-Python emitters
+        keep = words_arr[ic] != words_arr[jc]
+        if not keep.all():
+            ic = ic[keep]
+            jc = jc[keep]
+        fwd = np.char.add(left_sp[ic], words_arr[jc])
+        rev = np.char.add(left_sp[jc], words_arr[ic])
+        out = [None] * (2 * len(ic))
+        out[0::2] = fwd.tolist()
+        out[1::2] = rev.tolist()
+        yield from out
 
 if __name__ == "__main__":
     permute_by_value(sys.stdin)
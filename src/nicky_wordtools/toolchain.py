@@ -17,16 +17,18 @@ Layers of help:
   toolchain.py --help --stats        # show stats stage help
 """
 import sys
-import os
 import argparse
-import subprocess
 import logging
-from statistics import mean
 
-# Locate utilities directory relative to this script
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UTIL_DIR = os.path.join(BASE_DIR, 'utilities')
-PYTHON = sys.executable
+try:
+    from .permute import permute_iter
+    from .fill_interstices import fill_interstices
+    from .morph_caps import morph_iter, parse_spec
+except ImportError:
+    # running as a standalone script rather than a package module
+    from permute import permute_iter
+    from fill_interstices import fill_interstices
+    from morph_caps import morph_iter, parse_spec
 
 # Stage help texts
 _STAGE_HELP = {
@@ -100,55 +102,53 @@ def parse_args():
 
 
 def build_pipeline(args):
-    # Returns tuple (last_stdout, process_list)
-    proc_list = []
-    # Determine initial input
+    """
+    Compose the requested stages as in-process generators and return the
+    final line iterator. Lines flow between stages as Python str objects
+    in one interpreter — no subprocess spawns, pipe copies, or
+    encode/decode cycles at the stage boundaries.
+    """
     if args.input:
-        input_stream = open(args.input, 'r')
+        stream = open(args.input, 'r')
     else:
-        input_stream = None  # means use stdin
+        stream = sys.stdin
 
-    current_stdin = input_stream or sys.stdin
-    # permute stage
     if args.permute:
-        proc = subprocess.Popen(
-            [PYTHON, os.path.join(UTIL_DIR, 'permute.py')],
-            stdin=current_stdin, stdout=subprocess.PIPE, text=True)
-        proc_list.append(proc)
-        current_stdin = proc.stdout
-    # fill stage
+        stream = permute_iter(stream)
     if args.fill:
-        proc = subprocess.Popen(
-            [PYTHON, os.path.join(UTIL_DIR, 'fill_interstices.py')] + args.fill,
-            stdin=current_stdin, stdout=subprocess.PIPE, text=True)
-        proc_list.append(proc)
-        current_stdin = proc.stdout
-    # morph stage
+        stream = fill_interstices(stream, args.fill)
     if args.morph:
-        proc = subprocess.Popen(
-            [PYTHON, os.path.join(UTIL_DIR, 'morph_caps.py')] + args.morph,
-            stdin=current_stdin, stdout=subprocess.PIPE, text=True)
-        proc_list.append(proc)
-        current_stdin = proc.stdout
-
-    return current_stdin, proc_list
+        stream = morph_iter(stream, [parse_spec(s) for s in args.morph])
+    return stream
 
 
 def do_stats(input_stream):
-    lines = [line.rstrip('\n') for line in input_stream]
-    if not lines:
+    # single streaming pass with running counters — candidate lists can be
+    # far too large to buffer in memory
+    count = 0
+    total_len = 0
+    shortest = None
+    longest = 0
+    for line in input_stream:
+        length = len(line) - 1 if line.endswith('\n') else len(line)
+        count += 1
+        total_len += length
+        if shortest is None or length < shortest:
+            shortest = length
+        if length > longest:
+            longest = length
+    if not count:
         print("No candidates generated.")
         return
-    lengths = [len(line) for line in lines]
-    print(f"Total candidates: {len(lines)}")
-    print(f"Shortest length: {min(lengths)}")
-    print(f"Longest length: {max(lengths)}")
-    print(f"Average length: {mean(lengths):.2f}")
+    print(f"Total candidates: {count}")
+    print(f"Shortest length: {shortest}")
+    print(f"Longest length: {longest}")
+    print(f"Average length: {total_len / count:.2f}")
 
 
 def main():
     args = parse_args()
-    last_stream, procs = build_pipeline(args)
+    last_stream = build_pipeline(args)
 
     # Stats mode
     if args.stats:
@@ -161,7 +161,7 @@ def main():
         out_f = open(args.output, 'w') if args.output else sys.stdout
         count = 0
         for line in last_stream:
-            out_f.write(line)
+            out_f.write(line if line.endswith('\n') else line + '\n')
             count += 1
         if args.output:
             out_f.close()
@@ -171,10 +171,6 @@ def main():
         logging.info(f"Candidates generated: {count}")
         logging.info(f"Output file: {args.output or 'stdout'}")
 
-    # Wait for subprocesses to finish
-    for p in procs:
-        p.wait()
-
 def cli():
     print("Hello from nicky!")
 
@@ -5,8 +5,8 @@ import pytest
 import sys
 import os
 
-# Add the utilities/ folder to sys.path so tests can import local modules
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Add the src/nicky_wordtools/ folder to sys.path so tests can import local modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'nicky_wordtools')))
 
 # No shared fixtures yet, but keeping this for consistency and future use
 
@@ -10,7 +10,7 @@ DIGITS_IN_ORDER = list('0123456789')
     ('?^', []),
 ])
 def test_basic_placeholders(mask, expected):
-    result = generate_separators(mask)
+    result = list(generate_separators(mask))
     assert result == expected
 
 @ pytest.mark.parametrize("mask, count, first, last", [
@@ -18,7 +18,7 @@ def test_basic_placeholders(mask, expected):
     ('?d?d?^', 100, '00)', '99('),
 ])
 def test_digit_combinations(mask, count, first, last):
-    result = generate_separators(mask)
+    result = list(generate_separators(mask))
     assert len(result) == count
     assert result[0] == first
     assert result[-1] == last
@@ -28,14 +28,14 @@ def test_digit_combinations(mask, count, first, last):
     ('{?d?^}', [f"{d}{SHIFT_MAP[d]}" for d in DIGITS_IN_ORDER]),
 ])
 def test_digit_caret(mask, expected):
-    result = generate_separators(mask)
+    result = list(generate_separators(mask))
     assert result == expected
 
 @ pytest.mark.parametrize("mask, expected", [
     ('{?d?^}-', [ (f"{d}{SHIFT_MAP[d]}")[::-1] for d in DIGITS_IN_ORDER]),
 ])
 def test_group_reverse(mask, expected):
-    result = generate_separators(mask)
+    result = list(generate_separators(mask))
     assert result == expected
 
 @ pytest.mark.parametrize("mask, count, first, last", [
@@ -43,7 +43,7 @@ def test_group_reverse(mask, expected):
     ('?d?d{?^?^}-', 100, '00))', '99(('),
 ])
 def test_group_extended(mask, count, first, last):
-    result = generate_separators(mask)
+    result = list(generate_separators(mask))
     assert len(result) == count
     assert result[0] == first
     assert result[-1] == last
@@ -54,7 +54,7 @@ def test_group_extended(mask, count, first, last):
 ])
 def test_max_insertion_length(mask, count):
     # Max tokens = 4 produces correct count
-    result = generate_separators(mask)
+    result = list(generate_separators(mask))
     assert len(result) == count
 
 @ pytest.mark.parametrize("mask, expected", [
@@ -63,7 +63,7 @@ def test_max_insertion_length(mask, count):
     ('{AB}-', ['BA']),
 ])
 def test_literal_and_group(mask, expected):
-    result = generate_separators(mask)
+    result = list(generate_separators(mask))
     assert result == expected
 
 @ pytest.mark.parametrize("mask", [
@@ -71,5 +71,5 @@ def test_literal_and_group(mask, expected):
     '?^?d',       # caret before any digit -> no outputs
 ])
 def test_invalid_sequences(mask):
-    result = generate_separators(mask)
+    result = list(generate_separators(mask))
     assert result == []
@@ -2,14 +2,15 @@ import pytest
 from io import StringIO
 from permute import permute_by_value
 
-def _run(input_lines, capsys):
+def _run(input_lines):
     """
-    Helper: run permute_by_value over the given lines and
-    return stdout lines as a list.
+    Helper: run permute_by_value over the given input and
+    return the emitted lines as a list, collected in an
+    in-memory sink rather than through pytest's fd capture.
     """
-    permute_by_value(StringIO(input_lines))
-    out, _ = capsys.readouterr()
-    return out.strip().splitlines()
+    sink = StringIO()
+    permute_by_value(input_lines, out=sink)
+    return sink.getvalue().strip().splitlines()
 
 
 @pytest.mark.parametrize("input_lines, expected", [
@@ -26,8 +27,8 @@ def _run(input_lines, capsys):
     # (3) Invalid weight string → unweighted fallback
     ("foo bar\nbaz 3\n", ["foo baz", "baz foo"]),
 ])
-def test_unweighted_missing_and_invalid(input_lines, expected, capsys):
-    assert _run(input_lines, capsys) == expected
+def test_unweighted_missing_and_invalid(input_lines, expected):
+    assert _run(input_lines) == expected
 
 
 @pytest.mark.parametrize("input_lines, expected", [
@@ -40,18 +41,18 @@ def test_unweighted_missing_and_invalid(input_lines, expected, capsys):
         "beta gamma", "gamma beta",
     ]),
 ])
-def test_weighted_integers(input_lines, expected, capsys):
-    assert _run(input_lines, capsys) == expected
+def test_weighted_integers(input_lines, expected):
+    assert _run(input_lines) == expected
 
 
-def test_weighted_floats_and_negatives(capsys):
+def test_weighted_floats_and_negatives():
     # Floats
     inp = "a 1.5\nb 2.5\n"
-    assert _run(inp, capsys) == ["b a", "a b"]
+    assert _run(inp) == ["b a", "a b"]
 
     # Negative integers
     inp2 = "a -1\nb 2\nc 0\n"
-    assert _run(inp2, capsys) == [
+    assert _run(inp2) == [
         "b c", "c b",
         "b a", "a b",
         "c a", "a c",
@@ -59,10 +60,61 @@ def test_weighted_floats_and_negatives(capsys):
 
     # Negative floats
     inp3 = "x -1.5\ny 0.5\n"
-    assert _run(inp3, capsys) == ["y x", "x y"]
+    assert _run(inp3) == ["y x", "x y"]
 
 
-def test_ignores_blank_lines(capsys):
+def test_duplicate_words_never_pair_with_themselves():
+    # duplicate entries are still distinct entries, but "foo foo" pairs
+    # are suppressed in every mode
+    # weighted (heap path: three distinct weights)
+    assert _run("foo 1\nfoo 2\nbar 3\n") == [
+        "bar foo", "foo bar",
+        "bar foo", "foo bar",
+    ]
+    # weighted (grouped path: one shared weight)
+    assert _run("foo 1\nfoo 1\nbar 1\n") == [
+        "foo bar", "bar foo",
+        "foo bar", "bar foo",
+    ]
+    # unweighted fallback
+    assert _run("foo\nfoo\nbar\n") == [
+        "foo bar",
+        "foo bar",
+        "bar foo", "bar foo",
+    ]
+
+
+def test_numpy_and_heap_paths_agree(monkeypatch):
+    # The vectorized path must emit exactly what the pure-Python heap
+    # path emits, including mirror-pair adjacency and tie order.
+    pytest.importorskip("numpy")
+    import permute as permute_mod
+
+    lines = [f"w{i} {(i * 37) % 11}" for i in range(permute_mod._NUMPY_MIN_ENTRIES + 5)]
+    vectorized = list(permute_mod.permute_iter(iter(lines)))
+    monkeypatch.setattr(permute_mod, "np", None)
+    pure = list(permute_mod.permute_iter(iter(lines)))
+    assert vectorized == pure
+
+
+def test_iter_pairs_kernel_matches_parsed_path():
+    # The emission kernel takes pre-tokenized records, so perf runs can
+    # target it without the line parser; it must agree with the full
+    # parse-then-emit path on the same data.
+    import permute as permute_mod
+
+    words = [f"w{i}" for i in range(20)]
+    weights = [float((i * 7) % 5) for i in range(20)]
+    lines = [f"{w} {wt}" for w, wt in zip(words, weights)]
+    kernel = list(permute_mod._iter_pairs(words, weights))
+    parsed = list(permute_mod.permute_iter(iter(lines)))
+    assert kernel == parsed
+
+    unweighted = list(permute_mod._iter_pairs(words, [None] * 20, unweighted_mode=True))
+    assert unweighted == list(permute_mod.permute_iter(iter(words)))
+
+
+def test_ignores_blank_lines():
     input_lines = """
 word1 5
 
@@ -75,4 +127,4 @@ word3 7
         "word2 word1", "word1 word2",
         "word3 word1", "word1 word3"
     ]
-    assert sorted(_run(input_lines, capsys)) == sorted(expected)
+    assert sorted(_run(input_lines)) == sorted(expected)